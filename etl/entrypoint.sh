@@ -46,7 +46,7 @@ if [ ! -f "$APP_CONFIG" ]; then
   },
   "async": {
     "max_concurrent_requests": 10,
-    "db_batch_size": 1000,
+    "db_batch_size": 32768,
     "connection_pool_size": 10,
     "max_overflow": 20
   },
@@ -2,16 +2,24 @@
 """Census API ETL"""
 
 import argparse
+import hashlib
+import io
 import json
 import logging
 import os
+import struct
 import sys
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
-import censusdata
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import requests
+from psycopg2.extras import execute_values
 from sqlalchemy import create_engine, text
 
 # Import ConfigLoader
@@ -20,6 +28,18 @@ from config_loader import ConfigLoader
 
 DB_SCHEMA = None
 
+# ACS 5-year API; {year} is the survey end year
+ACS5_URL = "https://api.census.gov/data/{year}/acs/acs5"
+ZCTA_GEO = "zip code tabulation area"
+
+# Bump when the cached parquet layout changes (dtypes, column order)
+CENSUS_CACHE_VERSION = 1
+# Accepted values for census.copy_format
+COPY_FORMATS = frozenset({"binary", "csv"})
+# PostgreSQL binary COPY framing: signature, flags, header extension length
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PGCOPY_TRAILER = struct.pack(">h", -1)
+
 # Ensure logs directory exists
 os.makedirs("/app/logs", exist_ok=True)
 
@@ -35,14 +55,81 @@ logger = logging.getLogger(__name__)
 
 
 class SimpleCensusETL:
-    def __init__(self, config_file="config.json"):
+    # Payload columns in table order; id/created_at are left to their defaults
+    CENSUS_COLUMNS = (
+        "zip_code",
+        "year",
+        "total_pop",
+        "hhi_150k_200k",
+        "hhi_220k_plus",
+        "males_10_14",
+        "females_10_14",
+        "white_males_10_14",
+        "black_males_10_14",
+        "hispanic_males_10_14",
+        "white_females_10_14",
+        "black_females_10_14",
+        "hispanic_females_10_14",
+        "data_source",
+    )
+    # ACS variable code -> census_data column, fixed for every year fetched
+    CENSUS_VARIABLES = {
+        "B01003_001E": "total_pop",
+        "B19001_016E": "hhi_150k_200k",
+        "B19001_017E": "hhi_220k_plus",
+        "B01001_005E": "males_10_14",
+        "B01001_029E": "females_10_14",
+        "B01001A_005E": "white_males_10_14",
+        "B01001B_005E": "black_males_10_14",
+        "B01001I_005E": "hispanic_males_10_14",
+        "B01001A_020E": "white_females_10_14",
+        "B01001B_020E": "black_females_10_14",
+        "B01001I_020E": "hispanic_females_10_14",
+    }
+    CENSUS_VARIABLE_CODES = list(CENSUS_VARIABLES)
+    # (name, column list) pairs, built once the load has finished
+    CENSUS_INDEXES = (
+        ("idx_census_zip_year", "(zip_code, year)"),
+        ("idx_census_year", "(year)"),
+    )
+    # (database URL, schema) pairs already created by this process; keyed on
+    # the URL so another database with the same schema name is still set up
+    _schema_ensured: set[tuple[str, str]] = set()
+
+    def __init__(self, config_file="config.json", engine=None):
         # Use new ConfigLoader
         self.config_loader = ConfigLoader(config_file)
         self.config = self.config_loader.config
         global DB_SCHEMA
         DB_SCHEMA = self.config.get("schema", "public")
         logger.info(f"Configuration loaded with schema: {DB_SCHEMA}")
-        self.engine = None
+        # An injected engine is shared with other components; its owner disposes it
+        self.engine = engine
+        self._owns_engine = engine is None
+        # Reused across years so each request rides the same keep-alive socket
+        self._http = requests.Session()
+        # Background work (prefetch, index builds) shares one pool for the
+        # ETL's lifetime instead of spinning up a pool per step
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="census-io"
+        )
+        # Checked up front: a bad value inside the insert path would only be
+        # logged and silently degrade every batch to the INSERT fallback
+        self._copy_format = self.config.get("census", {}).get("copy_format", "binary")
+        if self._copy_format not in COPY_FORMATS:
+            raise ValueError(
+                f"census.copy_format must be one of {sorted(COPY_FORMATS)}, "
+                f"got {self._copy_format!r}"
+            )
+        self._insert_sql = (
+            f"INSERT INTO {DB_SCHEMA}.census_data "
+            f"({', '.join(self.CENSUS_COLUMNS)}) VALUES %s"
+        )
+
+    def close(self):
+        """Release the HTTP session and worker pool; the owner calls this once."""
+        self._http.close()
+        self._io_executor.shutdown()
 
     def connect_to_database(self):
         try:
@@ -50,15 +137,16 @@ class SimpleCensusETL:
             connection_string = self.config_loader.get_db_connection_string()
             logger.info(f"Connecting to database...")
 
-            self.engine = create_engine(connection_string, pool_pre_ping=True)
+            # pool_pre_ping validates connections on checkout
+            if self.engine is None:
+                self.engine = create_engine(connection_string, pool_pre_ping=True)
 
-            with self.engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
-
-            if DB_SCHEMA:
+            schema_key = (str(self.engine.url), DB_SCHEMA)
+            if DB_SCHEMA and schema_key not in self._schema_ensured:
                 with self.engine.connect() as conn:
                     conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {DB_SCHEMA};"))
                     conn.commit()
+                self._schema_ensured.add(schema_key)
                 logger.info(f"Schema '{DB_SCHEMA}' ready")
 
             logger.info("Database connected successfully")
@@ -74,7 +162,7 @@ class SimpleCensusETL:
                 drop_sql = f"DROP TABLE IF EXISTS {DB_SCHEMA}.census_data CASCADE;"
                 conn.execute(text(drop_sql))
                 create_sql = f"""
-                CREATE TABLE {DB_SCHEMA}.census_data (
+                CREATE UNLOGGED TABLE {DB_SCHEMA}.census_data (
                     id SERIAL PRIMARY KEY,
                     zip_code VARCHAR(10),
                     year INTEGER,
@@ -94,16 +182,6 @@ class SimpleCensusETL:
                 );
                 """
                 conn.execute(text(create_sql))
-                conn.execute(
-                    text(
-                        f"CREATE INDEX idx_census_zip_year ON {DB_SCHEMA}.census_data(zip_code, year);"
-                    )
-                )
-                conn.execute(
-                    text(
-                        f"CREATE INDEX idx_census_year ON {DB_SCHEMA}.census_data(year);"
-                    )
-                )
                 conn.commit()
                 logger.info("Tables created")
 
@@ -111,60 +189,111 @@ class SimpleCensusETL:
             logger.error(f"Failed to create tables: {e}")
             raise
 
+    def finalize_table(self):
+        """Make the loaded table durable, then index and analyze it."""
+        # The yearly COPYs skipped WAL on the UNLOGGED table; switch it back
+        # before the secondary indexes exist so only the heap is rewritten
+        with self.engine.connect() as conn:
+            conn.execute(text(f"ALTER TABLE {DB_SCHEMA}.census_data SET LOGGED;"))
+            conn.commit()
+
+        def build(name, columns):
+            with self.engine.connect() as conn:
+                conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS {name} "
+                        f"ON {DB_SCHEMA}.census_data{columns};"
+                    )
+                )
+                conn.commit()
+
+        # Each build gets its own pooled connection, so they run side by side
+        list(self._io_executor.map(lambda index: build(*index), self.CENSUS_INDEXES))
+        with self.engine.connect() as conn:
+            conn.execute(text(f"ANALYZE {DB_SCHEMA}.census_data;"))
+            conn.commit()
+        logger.info("Census table finalized")
+
+    def _cache_path(self, year):
+        """Parquet path for a year's frame, or None when census.cache_dir is unset.
+
+        Off by default; a relative cache_dir resolves against the working
+        directory, so set an absolute path when the ETL runs from elsewhere.
+        """
+        cache_dir = self.config.get("census", {}).get("cache_dir")
+        if not cache_dir:
+            return None
+        # Keyed on the file layout version and the variable list, so changing
+        # either one invalidates old files
+        key = hashlib.md5(
+            f"{CENSUS_CACHE_VERSION}:{','.join(self.CENSUS_VARIABLE_CODES)}".encode()
+        ).hexdigest()
+        return Path(cache_dir) / f"census_{year}_{key[:12]}.parquet"
+
     def fetch_census_data(self, year):
+        """Return the year's rows, or None when there is nothing to load."""
         try:
+            cache_path = self._cache_path(year)
+            if cache_path is not None and cache_path.exists():
+                census_data = pd.read_parquet(cache_path)
+                logger.info(f"Loaded {len(census_data)} records for {year} from cache")
+                return census_data
+
             logger.info(f"Fetching data for {year}...")
 
-            census_variables = {
-                "B01003_001E": "total_pop",
-                "B19001_016E": "hhi_150k_200k",
-                "B19001_017E": "hhi_220k_plus",
-                "B01001_005E": "males_10_14",
-                "B01001_029E": "females_10_14",
-                "B01001A_005E": "white_males_10_14",
-                "B01001B_005E": "black_males_10_14",
-                "B01001I_005E": "hispanic_males_10_14",
-                "B01001A_020E": "white_females_10_14",
-                "B01001B_020E": "black_females_10_14",
-                "B01001I_020E": "hispanic_females_10_14",
+            params = {
+                "get": ",".join(self.CENSUS_VARIABLE_CODES),
+                "for": f"{ZCTA_GEO}:*",
             }
-
-            variable_codes = list(census_variables.keys())
-            census_data = censusdata.download(
-                "acs5",
-                year,
-                censusdata.censusgeo([("zip code tabulation area", "*")]),
-                variable_codes,
+            api_key = self.config.get("census", {}).get("api_key")
+            if api_key:
+                params["key"] = api_key
+            response = self._http.get(
+                ACS5_URL.format(year=year), params=params, timeout=120
             )
-
-            if census_data.empty:
+            response.raise_for_status()
+            # The API answers with a list of rows; the first is the header
+            rows = response.json()
+            if len(rows) < 2:
                 logger.warning(f"No data for {year}")
-                return pd.DataFrame()
-
-            census_data.reset_index(inplace=True)
-            census_data["zip_code"] = census_data["index"].apply(
-                lambda x: x.params()[0][1]
-                if hasattr(x, "params") and x.params()
-                else str(x)
-            )
+                return None
+            census_data = pd.DataFrame(rows[1:], columns=rows[0])
 
-            for old_name, new_name in census_variables.items():
-                if old_name in census_data.columns:
-                    census_data.rename(columns={old_name: new_name}, inplace=True)
-
-            census_data["year"] = year
-            census_data["data_source"] = "census_api"
-            census_data.drop(columns=["index"], inplace=True, errors="ignore")
-            for col in census_data.columns:
-                if col not in ["zip_code", "year", "data_source"]:
-                    census_data[col] = census_data[col].fillna(0)
+            present = {
+                old_name: new_name
+                for old_name, new_name in self.CENSUS_VARIABLES.items()
+                if old_name in census_data.columns
+            }
+            # One pass: NaN -> 0 and downcast to the INTEGER columns' width
+            values = np.nan_to_num(
+                census_data[list(present)]
+                .apply(pd.to_numeric, errors="coerce")
+                .to_numpy(dtype="float64"),
+                nan=0,
+            ).astype("int32", order="F")
+
+            # Built in CENSUS_COLUMNS order so the insert needs no reorder copy
+            columns = {
+                "zip_code": census_data[ZCTA_GEO].to_numpy(),
+                "year": np.int32(year),
+            }
+            for i, new_name in enumerate(present.values()):
+                columns[new_name] = values[:, i]
+            columns["data_source"] = "census_api"
+            census_data = pd.DataFrame(columns)
 
             logger.info(f"Fetched {len(census_data)} records for {year}")
+            if cache_path is not None:
+                try:
+                    cache_path.parent.mkdir(parents=True, exist_ok=True)
+                    census_data.to_parquet(cache_path, compression="zstd", index=False)
+                except Exception as e:
+                    logger.warning(f"Could not cache {year}: {e}")
             return census_data
 
         except Exception as e:
             logger.error(f"Failed to fetch {year}: {e}")
-            return pd.DataFrame()
+            return None
 
     def insert_data_to_db(self, data):
         try:
@@ -173,14 +302,23 @@ class SimpleCensusETL:
                 return 0
 
             logger.info(f"Inserting {len(data)} records...")
-            data.to_sql(
-                "census_data",
-                self.engine,
-                schema=DB_SCHEMA,
-                if_exists="append",
-                index=False,
-                method="multi",
-            )
+            if tuple(data.columns) != self.CENSUS_COLUMNS:
+                data = data[list(self.CENSUS_COLUMNS)]
+            if self.engine.dialect.driver == "psycopg2":
+                try:
+                    self.copy_data_to_db(data)
+                except Exception as e:
+                    logger.warning(f"COPY failed ({e}); falling back to INSERT")
+                    self.insert_data_to_db_fast(data)
+            else:
+                data.to_sql(
+                    "census_data",
+                    self.engine,
+                    schema=DB_SCHEMA,
+                    if_exists="append",
+                    index=False,
+                    method="multi",
+                )
 
             logger.info(f"Inserted {len(data)} records")
             return len(data)
@@ -189,23 +327,125 @@ class SimpleCensusETL:
             logger.error(f"Insert failed: {e}")
             return 0
 
+    def copy_data_to_db(self, data):
+        """Stream rows with COPY FROM STDIN, binary unless census.copy_format is csv."""
+        chunk_size = self.config.get("async", {}).get("db_batch_size", 32768)
+        copy_format = self._copy_format
+        encode = (
+            self._encode_copy_binary
+            if copy_format == "binary"
+            else self._encode_copy_csv
+        )
+        sql = (
+            f"COPY {DB_SCHEMA}.census_data ({', '.join(self.CENSUS_COLUMNS)}) "
+            f"FROM STDIN WITH (FORMAT {copy_format})"
+        )
+
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                for start in range(0, len(data), chunk_size):
+                    cur.copy_expert(sql, encode(data.iloc[start : start + chunk_size]))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(data)
+
+    def _encode_copy_binary(self, data):
+        int_cols = list(self.CENSUS_COLUMNS[1:-1])
+        n_cols = struct.pack(">h", len(self.CENSUS_COLUMNS))
+
+        # Every INTEGER field is a (length=4, value) pair of big-endian int32s
+        int_fields = np.empty((len(data), 2 * len(int_cols)), dtype=">i4")
+        int_fields[:, 0::2] = 4
+        int_fields[:, 1::2] = data[int_cols].to_numpy(dtype="int32")
+        int_bytes = int_fields.tobytes()
+        row_width = int_fields.shape[1] * 4
+
+        buf = io.BytesIO()
+        buf.write(PGCOPY_HEADER)
+        for i, (zip_code, source) in enumerate(
+            zip(data["zip_code"], data["data_source"])
+        ):
+            zip_bytes = str(zip_code).encode("utf-8")
+            source_bytes = source.encode("utf-8")
+            buf.write(n_cols)
+            buf.write(struct.pack(">i", len(zip_bytes)))
+            buf.write(zip_bytes)
+            buf.write(int_bytes[i * row_width : (i + 1) * row_width])
+            buf.write(struct.pack(">i", len(source_bytes)))
+            buf.write(source_bytes)
+        buf.write(PGCOPY_TRAILER)
+        buf.seek(0)
+        return buf
+
+    def _encode_copy_csv(self, data):
+        buf = io.StringIO()
+        data.to_csv(buf, index=False, header=False)
+        buf.seek(0)
+        return buf
+
+    def insert_data_to_db_fast(self, data):
+        """Insert with a single parameterized template via execute_values."""
+        chunk_size = self.config.get("async", {}).get("db_batch_size", 32768)
+        rows = list(data.itertuples(index=False, name=None))
+
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                for start in range(0, len(rows), chunk_size):
+                    execute_values(
+                        cur,
+                        self._insert_sql,
+                        rows[start : start + chunk_size],
+                        page_size=1000,
+                    )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(rows)
+
     def save_to_csv(self, data, filename):
         try:
             if data.empty:
                 logger.warning("No data to save")
                 return
 
-            data.to_csv(f"../outputs/{filename}", index=False, encoding="utf-8")
+            # Arrow's C++ writer encodes off the GIL, far faster than to_csv
+            pacsv.write_csv(
+                pa.Table.from_pandas(data, preserve_index=False),
+                f"../outputs/{filename}",
+            )
             logger.info(f"Saved to ./outputs/{filename}")
 
         except Exception as e:
             logger.error(f"CSV save failed: {e}")
 
+    def save_to_parquet(self, data, filename):
+        try:
+            if data.empty:
+                logger.warning("No data to save")
+                return
+
+            data.to_parquet(f"../outputs/{filename}", compression="zstd", index=False)
+            logger.info(f"Saved to ./outputs/{filename}")
+
+        except Exception as e:
+            logger.error(f"Parquet save failed: {e}")
+
     def run_etl(self, begin_year, end_year):
         start_time = datetime.now()
         total_years = end_year - begin_year + 1
         total_inserted = 0
         all_data = []
+        # Set once census_data exists UNLOGGED and still needs finalize_table
+        needs_finalize = False
 
         try:
             logger.info("=" * 60)
@@ -215,20 +455,49 @@ class SimpleCensusETL:
 
             self.connect_to_database()
             self.create_tables()
-            for i, year in enumerate(range(begin_year, end_year + 1)):
+            needs_finalize = True
+            years = list(range(begin_year, end_year + 1))
+            if not years:
+                logger.warning(f"No census years between {begin_year} and {end_year}")
+                return
+            # Year N+1 downloads in the background while year N is COPYed,
+            # so the API and the database are busy at the same time
+            pending = self._io_executor.submit(self.fetch_census_data, years[0])
+            for i, year in enumerate(years):
                 progress = (i + 1) / total_years * 100
                 logger.info(f"{year} ({i+1}/{total_years}) - {progress:.1f}%")
 
-                year_data = self.fetch_census_data(year)
-                if not year_data.empty:
+                year_data = pending.result()
+                if i + 1 < total_years:
+                    pending = self._io_executor.submit(
+                        self.fetch_census_data, years[i + 1]
+                    )
+                if year_data is not None:
                     inserted = self.insert_data_to_db(year_data)
                     total_inserted += inserted
                     all_data.append(year_data)
                 else:
                     logger.warning(f"No data for {year}")
+            needs_finalize = False
+            self.finalize_table()
             if all_data:
                 consolidated_data = pd.concat(all_data, ignore_index=True)
-                self.save_to_csv(consolidated_data, "census_data_consolidated.csv")
+                # Both writers spend most of their time in Arrow's C++ code,
+                # so the CSV and the typed, compressed Parquet copy overlap
+                saves = [
+                    self._io_executor.submit(
+                        self.save_to_csv,
+                        consolidated_data,
+                        "census_data_consolidated.csv",
+                    ),
+                    self._io_executor.submit(
+                        self.save_to_parquet,
+                        consolidated_data,
+                        "census_data_consolidated.parquet",
+                    ),
+                ]
+                for save in saves:
+                    save.result()
 
             end_time = datetime.now()
             duration = end_time - start_time
@@ -251,7 +520,14 @@ class SimpleCensusETL:
             logger.error("=" * 60)
             raise
         finally:
-            if self.engine:
+            if needs_finalize:
+                # An early return or a failed year must not leave the table
+                # unlogged (truncated on crash) and unindexed
+                try:
+                    self.finalize_table()
+                except Exception as e:
+                    logger.error(f"Failed to finalize census table: {e}")
+            if self.engine and self._owns_engine:
                 self.engine.dispose()
 
 
@@ -269,7 +545,10 @@ def main():
     try:
         logger.info(f"Census ETL: {args.begin_year} to {args.end_year}")
         etl = SimpleCensusETL(config_file=args.config)
-        etl.run_etl(begin_year=args.begin_year, end_year=args.end_year)
+        try:
+            etl.run_etl(begin_year=args.begin_year, end_year=args.end_year)
+        finally:
+            etl.close()
         logger.info("Census ETL completed")
 
     except Exception as e:
@@ -1,19 +1,25 @@
 #!/usr/bin/env python3
+import csv
+import io
 import json
 import logging
 import os
 import sys
 import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from typing import Optional, Tuple
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import psycopg2
 import requests
+import shapely
 from dotenv import load_dotenv
-from shapely.geometry import Point
+from requests.adapters import HTTPAdapter
 
 # Import ConfigLoader
 sys.path.append(str(Path(__file__).parent.parent / "config"))
@@ -25,11 +31,6 @@ load_dotenv(override=True)
 os.makedirs("/app/logs", exist_ok=True)
 
 
-def _strip_fips(series):
-    """Strip leading zeros from FIPS codes, replace empty with '0'."""
-    return series.astype(str).str.lstrip("0").replace({"": "0"})
-
-
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
@@ -41,6 +42,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 DB_SCHEMA = None
+_CONN = None
 SOURCE_TABLE = "test.urban_ccd_directory_exp"
 COORD_PREDICATE = (
     "latitude IS NOT NULL AND longitude IS NOT NULL "
@@ -48,6 +50,25 @@ COORD_PREDICATE = (
     "AND CAST(latitude AS DOUBLE PRECISION) BETWEEN -90 AND 90 "
     "AND CAST(longitude AS DOUBLE PRECISION) BETWEEN -180 AND 180"
 )
+LOCATION_COLUMNS = (
+    "latitude",
+    "longitude",
+    "zip",
+    "county",
+    "county_fips",
+    "state",
+    "state_fips",
+)
+LOCATION_INDEXES = (
+    "lat_lon ON (latitude, longitude)",
+    "zip ON (zip)",
+    "state ON (state)",
+    "county_fips ON (county_fips)",
+)
+# Total memory (MB) and parallel workers for index builds, split evenly
+# across the builds that run at once; override under "location" in config
+INDEX_BUILD_MEMORY_MB = 1024
+INDEX_BUILD_WORKERS = 4
 TIGER_BASE_URL = "https://www2.census.gov/geo/tiger/TIGER2023"
 TIGER_FILES = {
     "zcta": ("tl_2023_us_zcta520.zip", "ZCTA520"),
@@ -65,15 +86,23 @@ def load_config(config_file="config.json"):
     return config_loader.config
 
 
-def get_db_connection(config_file="config.json"):
-    """Get database connection using ConfigLoader"""
+def get_db_connection(config_file="config.json", shared=True):
+    """Get database connection using ConfigLoader
+
+    The pipeline reuses one open connection across calls; pass shared=False
+    for a dedicated connection the caller closes itself.
+    """
+    global DB_SCHEMA, _CONN
+    if shared and _CONN is not None and not _CONN.closed:
+        return _CONN
+
     config_loader = ConfigLoader(config_file)
-    global DB_SCHEMA
     DB_SCHEMA = config_loader.config.get("schema", "public")
 
-    # Use ConfigLoader's psycopg2 connection params
+    # Use ConfigLoader's psycopg2 connection params; keepalives stop idle
+    # connections being dropped during long spatial joins
     conn_params = config_loader.get_psycopg2_connection_params()
-    conn = psycopg2.connect(**conn_params)
+    conn = psycopg2.connect(**conn_params, keepalives=1, keepalives_idle=30)
 
     if DB_SCHEMA:
         with conn.cursor() as cur:
@@ -81,9 +110,20 @@ def get_db_connection(config_file="config.json"):
         conn.commit()
         logger.info(f"Schema '{DB_SCHEMA}' is ready")
 
+    if shared:
+        _CONN = conn
     return conn
 
 
+def close_shared_connection():
+    """Close the pipeline's shared connection, if one is open."""
+    global _CONN
+    if _CONN is not None:
+        if not _CONN.closed:
+            _CONN.close()
+        _CONN = None
+
+
 def test_database_connection():
     try:
         with get_db_connection() as conn:
@@ -126,7 +166,9 @@ def _get_data_dir(cli_dir: Optional[str] = None) -> Path:
     return Path(cli_dir or os.getenv("TIGER_DATA_DIR") or "tiger_data").resolve()
 
 
-def _download_file(url: str, target_dir: Path) -> Path:
+def _download_file(
+    url: str, target_dir: Path, session: Optional[requests.Session] = None
+) -> Path:
     target_dir.mkdir(parents=True, exist_ok=True)
     fname = url.split("/")[-1]
     file_path = target_dir / fname
@@ -136,12 +178,18 @@ def _download_file(url: str, target_dir: Path) -> Path:
         return file_path
 
     logger.info(f"Downloading {fname} ...")
-    r = requests.get(url, timeout=300, verify=False)
-    r.raise_for_status()
-
-    with open(file_path, "wb") as f:
-        f.write(r.content)
-    logger.info(f"Saved {fname} ({len(r.content)/1_000_000:.1f} MB)")
+    # Stream to a temp file so peak memory stays at one chunk and an
+    # interrupted download never looks complete on the next run
+    part_path = file_path.with_name(fname + ".part")
+    size = 0
+    with (session or requests).get(url, stream=True, timeout=300, verify=False) as r:
+        r.raise_for_status()
+        with open(part_path, "wb", buffering=1 << 20) as f:
+            for chunk in r.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+                size += len(chunk)
+    part_path.replace(file_path)
+    logger.info(f"Saved {fname} ({size/1_000_000:.1f} MB)")
     return file_path
 
 
@@ -163,13 +211,31 @@ def prepare_datasets(
     if force_download:
         logger.info("Force downloading TIGER datasets...")
 
-    for layer, (zip_name, folder) in TIGER_FILES.items():
-        if force_download or not (data_dir / zip_name).exists():
-            _download_file(f"{TIGER_BASE_URL}/{folder}/{zip_name}", data_dir)
+    urls = [
+        f"{TIGER_BASE_URL}/{folder}/{zip_name}"
+        for zip_name, folder in TIGER_FILES.values()
+        if force_download or not (data_dir / zip_name).exists()
+    ]
+    # One Session is deliberately shared by the download threads so they
+    # reuse TLS connections to www2.census.gov. All requests go to one host,
+    # so pool_maxsize (connections per host) must cover every worker, or the
+    # extras are opened and discarded on each request
+    workers = len(TIGER_FILES)
+    with requests.Session() as session:
+        session.mount("https://", HTTPAdapter(pool_maxsize=workers))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda url: _download_file(url, data_dir, session), urls))
 
     dirs = {layer: data_dir / layer for layer in TIGER_FILES}
-    for layer, (zip_name, _) in TIGER_FILES.items():
-        _extract_shapefile(data_dir / zip_name, dirs[layer])
+    # zlib releases the GIL while inflating, so threads extract in parallel
+    with ThreadPoolExecutor(max_workers=len(TIGER_FILES)) as pool:
+        list(
+            pool.map(
+                _extract_shapefile,
+                [data_dir / zip_name for zip_name, _ in TIGER_FILES.values()],
+                [dirs[layer] for layer in TIGER_FILES],
+            )
+        )
 
     return dirs["zcta"], dirs["county"], dirs["state"]
 
@@ -180,17 +246,35 @@ def load_geodata(zcta_dir: Path, county_dir: Path, state_dir: Path):
             FileNotFoundError(f"No .shp file found in {directory}")
         )
 
-    zcta_gdf = gpd.read_file(find_shp_file(zcta_dir))[["ZCTA5CE20", "geometry"]]
-    county_gdf = gpd.read_file(find_shp_file(county_dir))[
-        ["NAME", "STATEFP", "GEOID", "COUNTYFP", "geometry"]
-    ]
-    state_gdf = gpd.read_file(find_shp_file(state_dir))[
-        ["NAME", "STUSPS", "STATEFP", "geometry"]
-    ]
+    def read_layer(directory: Path, columns: list):
+        shp_path = find_shp_file(directory)
+        cache_path = directory.with_suffix(".parquet")
+        if (
+            cache_path.exists()
+            and cache_path.stat().st_mtime >= shp_path.stat().st_mtime
+        ):
+            return gpd.read_parquet(cache_path, columns=columns + ["geometry"])
+
+        # pyogrio reads in bulk through GDAL and only materializes `columns`
+        gdf = gpd.read_file(shp_path, engine="pyogrio", columns=columns)
+        gdf = gdf[columns + ["geometry"]]
+        # Later runs read the GeoParquet copy instead of re-parsing SHP/DBF
+        gdf.to_parquet(
+            cache_path,
+            compression="zstd",
+            geometry_encoding="WKB",
+            write_covering_bbox=True,
+        )
+        return gdf
 
+    zcta_gdf = read_layer(zcta_dir, ["ZCTA5CE20"])
+    county_gdf = read_layer(county_dir, ["NAME", "STATEFP", "GEOID", "COUNTYFP"])
+    state_gdf = read_layer(state_dir, ["NAME", "STUSPS", "STATEFP"])
+
+    # FIPS codes are numeric; parsing them once replaces zero-stripping strings
     for gdf in [state_gdf, county_gdf]:
-        gdf["STATEFP"] = _strip_fips(gdf["STATEFP"])
-    county_gdf["COUNTYFP"] = _strip_fips(county_gdf["COUNTYFP"])
+        gdf["STATEFP"] = gdf["STATEFP"].astype("int16")
+    county_gdf["COUNTYFP"] = county_gdf["COUNTYFP"].astype("int16")
 
     for gdf in [zcta_gdf, county_gdf, state_gdf]:
         if gdf.crs is None:
@@ -198,13 +282,34 @@ def load_geodata(zcta_dir: Path, county_dir: Path, state_dir: Path):
                 "A layer has no CRS; assuming EPSG:4269 -> converting to EPSG:4326"
             )
             gdf.set_crs(epsg=4269, inplace=True)
-        gdf.to_crs(epsg=4326, inplace=True)
-        _ = gdf.sindex
-
-    logger.info("Spatial indices prepared (ZCTA, County, State)")
+        if gdf.crs.to_epsg() == 4269:
+            # NAD83 and WGS84 differ by under a metre, below the precision of
+            # the source coordinates; relabel instead of running PROJ
+            gdf.set_crs(epsg=4326, allow_override=True, inplace=True)
+        else:
+            gdf.to_crs(epsg=4326, inplace=True)
+
+    logger.info("Geodata loaded (ZCTA, County, State)")
     return zcta_gdf, county_gdf, state_gdf
 
 
+def _to_ewkb_hex(gdf):
+    """Hex EWKB (SRID 4326) for each geometry; PostGIS parses it without WKT."""
+    return shapely.to_wkb(
+        shapely.set_srid(gdf.geometry.values, 4326), hex=True, include_srid=True
+    )
+
+
+def _copy_records(cur, table, columns, records):
+    """Stream tuples through COPY FROM STDIN as CSV; None becomes NULL."""
+    buf = io.StringIO()
+    csv.writer(buf).writerows(records)
+    buf.seek(0)
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf
+    )
+
+
 def save_tiger_to_db(zcta_gdf, county_gdf, state_gdf, table_name="census_geodata"):
     try:
         with get_db_connection() as conn:
@@ -218,58 +323,58 @@ def save_tiger_to_db(zcta_gdf, county_gdf, state_gdf, table_name="census_geodata
                         geoid VARCHAR(20),
                         name VARCHAR(255),
                         layer_type VARCHAR(20),
-                        state_fips VARCHAR(3),
-                        county_fips VARCHAR(4),
+                        state_fips SMALLINT,
+                        county_fips SMALLINT,
                         geometry GEOMETRY,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """
                 )
 
-                records = (
+                zcta_ids = zcta_gdf["ZCTA5CE20"].to_numpy()
+                records = [
+                    *zip(
+                        zcta_ids,
+                        zcta_ids,
+                        repeat("zcta"),
+                        repeat(None),
+                        repeat(None),
+                        _to_ewkb_hex(zcta_gdf),
+                    ),
+                    *zip(
+                        county_gdf["GEOID"].to_numpy(),
+                        county_gdf["NAME"].to_numpy(),
+                        repeat("county"),
+                        county_gdf["STATEFP"].to_numpy(),
+                        county_gdf["COUNTYFP"].to_numpy(),
+                        _to_ewkb_hex(county_gdf),
+                    ),
+                    *zip(
+                        state_gdf["STATEFP"].to_numpy(),
+                        state_gdf["NAME"].to_numpy(),
+                        repeat("state"),
+                        state_gdf["STATEFP"].to_numpy(),
+                        repeat(None),
+                        _to_ewkb_hex(state_gdf),
+                    ),
+                ]
+
+                _copy_records(
+                    cur,
+                    f"{DB_SCHEMA}.{table_name}",
                     [
-                        (
-                            row["ZCTA5CE20"],
-                            row["ZCTA5CE20"],
-                            "zcta",
-                            None,
-                            None,
-                            row["geometry"].wkt,
-                        )
-                        for _, row in zcta_gdf.iterrows()
-                    ]
-                    + [
-                        (
-                            row["GEOID"],
-                            row["NAME"],
-                            "county",
-                            row["STATEFP"],
-                            row["COUNTYFP"],
-                            row["geometry"].wkt,
-                        )
-                        for _, row in county_gdf.iterrows()
-                    ]
-                    + [
-                        (
-                            row["STATEFP"],
-                            row["NAME"],
-                            "state",
-                            row["STATEFP"],
-                            None,
-                            row["geometry"].wkt,
-                        )
-                        for _, row in state_gdf.iterrows()
-                    ]
-                )
-
-                cur.executemany(
-                    f"""
-                    INSERT INTO {DB_SCHEMA}.{table_name}
-                    (geoid, name, layer_type, state_fips, county_fips, geometry)
-                    VALUES (%s, %s, %s, %s, %s, ST_GeomFromText(%s, 4326))
-                """,
+                        "geoid",
+                        "name",
+                        "layer_type",
+                        "state_fips",
+                        "county_fips",
+                        "geometry",
+                    ],
                     records,
                 )
+                cur.execute(
+                    f"CREATE INDEX idx_{table_name}_geometry ON {DB_SCHEMA}.{table_name} USING GIST (geometry)"
+                )
 
             conn.commit()
             logger.info(
@@ -282,55 +387,226 @@ def save_tiger_to_db(zcta_gdf, county_gdf, state_gdf, table_name="census_geodata
         return False
 
 
-def spatial_join_points(points_df, zcta_gdf, county_gdf, state_gdf):
-    gdf_pts = gpd.GeoDataFrame(
-        points_df,
-        geometry=[
-            Point(lon, lat) for lat, lon in zip(points_df.latitude, points_df.longitude)
-        ],
-        crs="EPSG:4326",
+def _match_polygons(points, polygons):
+    """Position of a polygon containing each point, or -1 when none does."""
+    tree = shapely.STRtree(polygons, node_capacity=16)
+    # Prepared polygons cache their edge index, so the exact test on each
+    # bounding-box candidate is a cheap point-in-polygon lookup
+    shapely.prepare(polygons)
+    matched = np.full(len(points), -1, dtype=np.intp)
+
+    # The STRtree query is the bounding-box filter. It runs on this thread,
+    # which also caches every point's and polygon's envelope before fan-out
+    point_idx, poly_idx = tree.query(points)
+
+    # GEOS builds a prepared polygon's point-in-area index lazily and without
+    # locking, so each polygon is owned by exactly one worker: candidate pairs
+    # are grouped by polygon, and no prepared geometry is shared across threads
+    workers = os.cpu_count() or 1
+    order = np.argsort(poly_idx % workers, kind="stable")
+    groups = np.array_split(
+        order, np.searchsorted(poly_idx[order] % workers, np.arange(1, workers))
     )
 
-    result = gdf_pts
-    for gdf, cols, rename_map, suffix in [
-        (
-            state_gdf,
-            ["NAME", "STATEFP", "geometry"],
-            {"NAME": "state", "STATEFP": "state_fips"},
-            "_state",
-        ),
+    def exact(pairs):
+        hit = shapely.intersects(polygons[poly_idx[pairs]], points[point_idx[pairs]])
+        return pairs[hit]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Sorting restores query order, so a point in two polygons keeps the
+        # same winner as a serial pass
+        hits = np.sort(np.concatenate(list(pool.map(exact, groups))))
+    matched[point_idx[hits]] = poly_idx[hits]
+    return matched
+
+
+def spatial_join_points(points_df, zcta_gdf, county_gdf, state_gdf):
+    # Coordinates equal to 5 decimals (~1 m) share one polygon lookup;
+    # `inverse` maps every input row back to its quantized point
+    coords = np.column_stack(
+        [points_df.longitude.to_numpy(), points_df.latitude.to_numpy()]
+    ).round(5)
+    unique_coords, inverse = np.unique(coords, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    points = shapely.points(unique_coords)
+
+    result = points_df.reset_index(drop=True)
+    for gdf, rename_map in [
         (
             county_gdf,
-            ["NAME", "STATEFP", "COUNTYFP", "geometry"],
-            {"NAME": "county", "COUNTYFP": "county_fips"},
-            "_county",
+            {"NAME": "county", "COUNTYFP": "county_fips", "STATEFP": "state_fips"},
         ),
-        (zcta_gdf, None, {"ZCTA5CE20": "zip"}, "_zcta"),
+        (zcta_gdf, {"ZCTA5CE20": "zip"}),
     ]:
-        result = gpd.sjoin(
-            result,
-            gdf[cols] if cols else gdf,
-            predicate="within",
-            how="left",
-            rsuffix=suffix,
+        matched = _match_polygons(points, gdf.geometry.values)[inverse]
+        # Gather polygon attributes by matched position; -1 yields NaN
+        attrs = gdf[list(rename_map)].reset_index(drop=True).reindex(matched)
+        for src, dst in rename_map.items():
+            result[dst] = attrs[src].to_numpy()
+
+    # Counties nest inside states, so the county's STATEFP already names it
+    state_names = state_gdf.set_index("STATEFP")["NAME"]
+    result["state"] = result["state_fips"].map(state_names).to_numpy()
+
+    # Unmatched points keep NULL FIPS codes and empty names
+    result["state_fips"] = result["state_fips"].astype("Int16")
+    result["county_fips"] = result["county_fips"].astype("Int16")
+    # reindex already returns a new frame, so no separate copy is needed
+    return result.reindex(columns=list(LOCATION_COLUMNS)).fillna(
+        {"zip": "", "county": "", "state": ""}
+    )
+
+
+def _create_index(table_name, idx_name, col_def, memory_mb, workers):
+    """Build one index on its own connection so several build in parallel."""
+    conn = None
+    try:
+        conn = get_db_connection(shared=False)
+        with conn.cursor() as cur:
+            cur.execute(f"SET maintenance_work_mem = '{int(memory_mb)}MB'")
+            cur.execute(f"SET max_parallel_maintenance_workers = {int(workers)}")
+            cur.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{idx_name} ON {DB_SCHEMA}.{table_name}{col_def}"
+            )
+        conn.commit()
+    except Exception as ie:
+        logger.warning(f"Failed to create index idx_{table_name}_{idx_name}: {ie}")
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _finalize_location_table(conn, table_name, index_memory_mb, index_workers):
+    # Loaded without WAL; SET LOGGED writes the table once, before the
+    # indexes exist so it does not have to rebuild them
+    with conn.cursor() as cur:
+        cur.execute(f"ALTER TABLE {DB_SCHEMA}.{table_name} SET LOGGED")
+    conn.commit()
+
+    # The budget is shared, so hosted targets are not asked for a full
+    # allotment per concurrent build
+    builds = len(LOCATION_INDEXES)
+    memory_mb = max(64, index_memory_mb // builds)
+    workers = index_workers // builds
+
+    with ThreadPoolExecutor(max_workers=builds) as pool:
+        list(
+            pool.map(
+                lambda spec: _create_index(
+                    table_name, *spec.split(" ON "), memory_mb, workers
+                ),
+                LOCATION_INDEXES,
+            )
         )
-        result.rename(columns=rename_map, inplace=True)
 
-    result = result[
-        ["latitude", "longitude", "zip", "county", "county_fips", "state", "state_fips"]
-    ].copy()
-    result["state_fips"] = _strip_fips(result["state_fips"])
-    result["county_fips"] = _strip_fips(result["county_fips"])
-    result.fillna("", inplace=True)
-    return result
+    with conn.cursor() as cur:
+        cur.execute(f"ANALYZE {DB_SCHEMA}.{table_name}")
+    conn.commit()
+
+
+def _geodata_in_db(table_name="census_geodata"):
+    """True when a previous run left indexed TIGER polygons in the database."""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT to_regclass(%s)",
+                (f"{DB_SCHEMA}.idx_{table_name}_geometry",),
+            )
+            return cur.fetchone()[0] is not None
+
+
+def _create_location_table(cur, table_name):
+    logger.info("Creating location data table...")
+    cur.execute(f"DROP TABLE IF EXISTS {DB_SCHEMA}.{table_name} CASCADE")
+    cur.execute(
+        f"""
+        CREATE UNLOGGED TABLE {DB_SCHEMA}.{table_name} (
+            id SERIAL PRIMARY KEY,
+            latitude DOUBLE PRECISION NOT NULL,
+            longitude DOUBLE PRECISION NOT NULL,
+            zip VARCHAR(10),
+            county VARCHAR(100),
+            county_fips SMALLINT,
+            state VARCHAR(100),
+            state_fips SMALLINT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+
+
+def _geocode_in_db(cur, table_name, geodata_table="census_geodata"):
+    """Point-in-polygon join in PostGIS against the GIST-indexed TIGER table."""
+    geodata = f"{DB_SCHEMA}.{geodata_table}"
+    cur.execute(
+        f"""
+        INSERT INTO {DB_SCHEMA}.{table_name} ({", ".join(LOCATION_COLUMNS)})
+        SELECT c.latitude, c.longitude,
+               COALESCE(z.geoid, ''), COALESCE(co.name, ''), co.county_fips,
+               COALESCE(st.name, ''), co.state_fips
+        FROM (
+            SELECT DISTINCT CAST(latitude AS DOUBLE PRECISION) AS latitude,
+                            CAST(longitude AS DOUBLE PRECISION) AS longitude
+            FROM {SOURCE_TABLE}
+            WHERE {COORD_PREDICATE}
+        ) c
+        CROSS JOIN LATERAL (
+            SELECT ST_SetSRID(ST_MakePoint(c.longitude, c.latitude), 4326) AS pt
+        ) p
+        LEFT JOIN LATERAL (
+            SELECT geoid FROM {geodata}
+            WHERE layer_type = 'zcta' AND ST_Intersects(geometry, p.pt)
+            LIMIT 1
+        ) z ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT name, state_fips, county_fips FROM {geodata}
+            WHERE layer_type = 'county' AND ST_Intersects(geometry, p.pt)
+            LIMIT 1
+        ) co ON TRUE
+        LEFT JOIN (
+            SELECT DISTINCT ON (state_fips) state_fips, name FROM {geodata}
+            WHERE layer_type = 'state'
+        ) st ON st.state_fips = co.state_fips
+    """
+    )
+    return cur.rowcount
 
 
 def geocode_coordinates_to_location_data(
     table_name="location_data",
     data_dir: Optional[str] = None,
     force_download: bool = False,
+    index_memory_mb: int = INDEX_BUILD_MEMORY_MB,
+    index_workers: int = INDEX_BUILD_WORKERS,
 ):
     try:
+        if not force_download and _geodata_in_db():
+            # Polygons are already indexed in PostGIS from an earlier run, so
+            # the join runs server-side without loading any shapefiles
+            logger.info("Using census_geodata already in the database...")
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    start = time.time()
+                    _create_location_table(cur, table_name)
+                    row_count = _geocode_in_db(cur, table_name)
+                    if not row_count:
+                        conn.rollback()
+                        logger.warning("No coordinates found to process")
+                        return False
+                    logger.info(f"Spatial joins completed in {time.time()-start:.1f}s")
+                    cur.execute(
+                        f"SELECT COUNT(*) FROM {DB_SCHEMA}.{table_name} WHERE zip <> ''"
+                    )
+                    zip_count = cur.fetchone()[0]
+                conn.commit()
+                _finalize_location_table(
+                    conn, table_name, index_memory_mb, index_workers
+                )
+            logger.info(
+                f"Inserted {row_count:,} rows. ZIP codes populated: {zip_count:,} ({zip_count/row_count*100:.1f}%)"
+            )
+            return True
+
         data_path = _get_data_dir(data_dir)
         zcta_dir, county_dir, state_dir = prepare_datasets(data_path, force_download)
         zcta_gdf, county_gdf, state_gdf = load_geodata(zcta_dir, county_dir, state_dir)
@@ -344,21 +620,31 @@ def geocode_coordinates_to_location_data(
         with get_db_connection() as conn:
             with conn.cursor() as cur:
                 logger.info("Fetching coordinates from source table...")
-                cur.execute(
+                # COPY streams the result as one CSV buffer that pandas parses in
+                # C, instead of building a Python tuple per row with fetchall
+                buf = io.StringIO()
+                cur.copy_expert(
                     f"""
-                    SELECT DISTINCT CAST(latitude AS DOUBLE PRECISION) AS latitude,
-                                    CAST(longitude AS DOUBLE PRECISION) AS longitude
-                    FROM {SOURCE_TABLE}
-                    WHERE {COORD_PREDICATE}
-                """
+                    COPY (
+                        SELECT DISTINCT CAST(latitude AS DOUBLE PRECISION) AS latitude,
+                                        CAST(longitude AS DOUBLE PRECISION) AS longitude
+                        FROM {SOURCE_TABLE}
+                        WHERE {COORD_PREDICATE}
+                    ) TO STDOUT WITH (FORMAT csv)
+                """,
+                    buf,
                 )
-
-                rows = cur.fetchall()
-                if not rows:
+                if not buf.tell():
                     logger.warning("No coordinates found to process")
                     return False
 
-                coords_df = pd.DataFrame(rows, columns=["latitude", "longitude"])
+                buf.seek(0)
+                coords_df = pd.read_csv(
+                    buf,
+                    names=["latitude", "longitude"],
+                    dtype={"latitude": "float64", "longitude": "float64"},
+                )
+
                 logger.info(f"Loaded {len(coords_df):,} coordinate pairs")
 
                 start = time.time()
@@ -370,57 +656,28 @@ def geocode_coordinates_to_location_data(
                     f"Spatial joins completed in {time.time()-start:.1f}s. ZIP coverage: {zip_coverage:.1f}%"
                 )
 
-                logger.info("Creating location data table...")
-                cur.execute(f"DROP TABLE IF EXISTS {DB_SCHEMA}.{table_name} CASCADE")
-                cur.execute(
-                    f"""
-                    CREATE TABLE {DB_SCHEMA}.{table_name} (
-                        id SERIAL PRIMARY KEY,
-                        latitude DOUBLE PRECISION NOT NULL,
-                        longitude DOUBLE PRECISION NOT NULL,
-                        zip VARCHAR(10),
-                        county VARCHAR(100),
-                        county_fips VARCHAR(3),
-                        state VARCHAR(100),
-                        state_fips VARCHAR(3),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """
-                )
+                _create_location_table(cur, table_name)
 
-                records = list(enriched.itertuples(index=False, name=None))
-                cur.executemany(
+                # One CSV serialisation of the column arrays; FORCE_NOT_NULL keeps
+                # unmatched text fields as '' rather than NULL
+                buf = io.StringIO()
+                enriched.to_csv(buf, index=False, header=False)
+                buf.seek(0)
+                text_columns = "zip, county, state"
+                cur.copy_expert(
                     f"""
-                    INSERT INTO {DB_SCHEMA}.{table_name}
-                    (latitude, longitude, zip, county, county_fips, state, state_fips)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s)
+                    COPY {DB_SCHEMA}.{table_name} ({", ".join(LOCATION_COLUMNS)})
+                    FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({text_columns}))
                 """,
-                    records,
+                    buf,
                 )
 
             conn.commit()
+            _finalize_location_table(conn, table_name, index_memory_mb, index_workers)
 
-            with conn.cursor() as cur:
-                for col_spec in [
-                    "lat_lon ON (latitude, longitude)",
-                    "zip ON (zip)",
-                    "state ON (state)",
-                    "county_fips ON (county_fips)",
-                ]:
-                    idx_name, col_def = col_spec.split(" ON ")
-                    try:
-                        cur.execute(
-                            f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{idx_name} ON {DB_SCHEMA}.{table_name}{col_def}"
-                        )
-                    except Exception as ie:
-                        logger.warning(
-                            f"Failed to create index idx_{table_name}_{idx_name}: {ie}"
-                        )
-
-            conn.commit()
             zip_count = (enriched["zip"] != "").sum()
             logger.info(
-                f"Inserted {len(records):,} rows. ZIP codes populated: {zip_count:,} ({zip_count/len(records)*100:.1f}%)"
+                f"Inserted {len(enriched):,} rows. ZIP codes populated: {zip_count:,} ({zip_count/len(enriched)*100:.1f}%)"
             )
 
         return True
@@ -433,23 +690,31 @@ def geocode_coordinates_to_location_data(
 def main(args):
     logger.info("Starting TIGER/Line geocoding pipeline")
 
-    if args.test_only or not test_database_connection():
-        return (
-            test_database_connection()
-            if args.test_only
-            else (logger.error("Database prerequisite check failed") or False)
-        )
+    try:
+        if args.test_only or not test_database_connection():
+            return (
+                test_database_connection()
+                if args.test_only
+                else (logger.error("Database prerequisite check failed") or False)
+            )
 
-    start = time.time()
-    success = geocode_coordinates_to_location_data(
-        table_name=args.table_name,
-        data_dir=args.data_dir,
-        force_download=args.download_data,
-    )
+        start = time.time()
+        location_cfg = load_config().get("location", {})
+        success = geocode_coordinates_to_location_data(
+            table_name=args.table_name,
+            data_dir=args.data_dir,
+            force_download=args.download_data,
+            index_memory_mb=location_cfg.get("index_memory_mb", INDEX_BUILD_MEMORY_MB),
+            index_workers=location_cfg.get(
+                "index_parallel_workers", INDEX_BUILD_WORKERS
+            ),
+        )
 
-    if success:
-        logger.info(f"Pipeline completed in {time.time()-start:.1f}s")
-    return success
+        if success:
+            logger.info(f"Pipeline completed in {time.time()-start:.1f}s")
+        return success
+    finally:
+        close_shared_connection()
 
 
 if __name__ == "__main__":
@@ -1,46 +1,69 @@
 #!/usr/bin/env python3
 import argparse
 import asyncio
+import atexit
 import json
 import logging
 import os
+import queue
 import sys
+from contextlib import suppress
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Any
 
+from sqlalchemy import create_engine
+
 # Import ConfigLoader
 sys.path.append(str(Path(__file__).parent.parent / "config"))
 from config_loader import ConfigLoader
 
 from census_data import SimpleCensusETL
-from location_data import (geocode_coordinates_to_location_data,
+from location_data import (INDEX_BUILD_MEMORY_MB, INDEX_BUILD_WORKERS,
+                           close_shared_connection,
+                           geocode_coordinates_to_location_data,
                            test_database_connection)
 from urban_data import EndpointETL
 from urban_data import load_config as load_urban_config
 
+try:
+    import uvloop  # type: ignore
+except ImportError:
+    uvloop = None
+
 # Ensure logs directory exists
 os.makedirs("/app/logs", exist_ok=True)
 
+# Records go through a queue so file and console writes happen on the
+# listener thread instead of blocking the event loop. force=True replaces
+# the handlers the component modules installed when they were imported.
+_log_queue: queue.Queue = queue.Queue(-1)
+_log_listener = QueueListener(
+    _log_queue,
+    logging.FileHandler("/app/logs/main_etl.log"),
+    logging.StreamHandler(sys.stdout),
+)
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("/app/logs/main_etl.log"),
-        logging.StreamHandler(sys.stdout),
-    ],
+    handlers=[QueueHandler(_log_queue)],
+    force=True,
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 QA_MODE = os.getenv("QA_MODE", "false").lower() == "true"
 QA_BREAKPOINTS = os.getenv("QA_BREAKPOINTS", "false").lower() == "true"
 
 
-def qa_breakpoint(message: str, data: Any = None):
-    if QA_BREAKPOINTS:
-        logger.info(f"QA BREAKPOINT: {message}")
+if QA_BREAKPOINTS:
+
+    def qa_breakpoint(message: str, data: Any = None):
+        logger.info("QA BREAKPOINT: %s", message)
         if data is not None:
-            logger.info(f"Data shape: {getattr(data, 'shape', 'N/A')}")
-            logger.info(f"Data columns: {getattr(data, 'columns', 'N/A')}")
+            logger.info("Data shape: %s", getattr(data, "shape", "N/A"))
+            logger.info("Data columns: %s", getattr(data, "columns", "N/A"))
         if QA_MODE:
             import pdb
 
@@ -48,6 +71,11 @@ def qa_breakpoint(message: str, data: Any = None):
         else:
             input(f"Press Enter to continue... (QA: {message})")
 
+else:
+    # Resolved once at import: with breakpoints off every call is a no-op
+    def qa_breakpoint(message: str, data: Any = None):
+        pass
+
 
 class OrchestatedETLController:
     def __init__(self, config_file="config.json"):
@@ -57,19 +85,53 @@ class OrchestatedETLController:
         logger.info("Configuration loaded successfully using ConfigLoader")
         self.census_etl = None
         self.urban_etl = None
+        self.engine = None
+        self.http = None
         self._initialize_etl_components()
         self.census_years = self.config.get("etl", {}).get("census_years", [2015, 2019])
         self.urban_years = self.config.get("etl", {}).get("urban_years", [2020, 2023])
 
+    async def __aenter__(self):
+        # One pooled HTTP session reused by every Urban ingest in this run
+        self.http = EndpointETL.create_http_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.http is not None:
+            await self.http.close()
+            self.http = None
+        if self.census_etl is not None:
+            self.census_etl.close()
+        if self.engine is not None:
+            self.engine.dispose()
+        close_shared_connection()
+
     def _initialize_etl_components(self):
         try:
-            self.census_etl = SimpleCensusETL(config_file="config.json")
+            # One connection pool serves both components, so Census and Urban
+            # reuse warm connections instead of each opening their own
+            async_cfg = self.config.get("async", {})
+            self.engine = create_engine(
+                self.config_loader.get_db_connection_string(),
+                pool_size=async_cfg.get("connection_pool_size", 10),
+                max_overflow=async_cfg.get("max_overflow", 20),
+                pool_pre_ping=True,
+                pool_recycle=3600,
+            )
+            self.census_etl = SimpleCensusETL(
+                config_file="config.json", engine=self.engine
+            )
             logger.info("Census ETL component initialized")
             urban_config = load_urban_config("config.json")
-            self.urban_etl = EndpointETL(config=urban_config, drop_existing=True)
+            self.urban_etl = EndpointETL(
+                config=urban_config,
+                drop_existing=True,
+                bulk_writer="copy",
+                engine=self.engine,
+            )
             logger.info("Urban Institute ETL component initialized")
         except Exception as e:
-            logger.error(f"Failed to initialize ETL components: {e}")
+            logger.error("Failed to initialize ETL components: %s", e)
             raise
 
     def run_census_etl(self, begin_year: int = None, end_year: int = None):
@@ -80,14 +142,14 @@ class OrchestatedETLController:
                 end_year = self.census_years[1]
 
             logger.info(
-                f"Starting Census ETL process for years {begin_year}-{end_year}"
+                "Starting Census ETL process for years %s-%s", begin_year, end_year
             )
             qa_breakpoint("Starting Census ETL process", None)
             self.census_etl.run_etl(begin_year=begin_year, end_year=end_year)
             logger.info("Census ETL process completed successfully")
             return True
         except Exception as e:
-            logger.error(f"Census ETL process failed: {e}")
+            logger.error("Census ETL process failed: %s", e)
             raise
 
     async def run_urban_etl(
@@ -100,18 +162,32 @@ class OrchestatedETLController:
                 end_year = self.urban_years[1]
 
             logger.info(
-                f"Starting Urban Institute ETL process for years {begin_year}-{end_year}"
+                "Starting Urban Institute ETL process for years %s-%s",
+                begin_year,
+                end_year,
             )
             qa_breakpoint("Starting Urban Institute ETL process", None)
+            # Same settings urban_data's CLI resolves: endpoint/year fetches run
+            # concurrently up to max_concurrent_requests
+            urban_pagination = self.config.get("urban", {}).get("pagination", {})
             stats = await self.urban_etl.ingest(
-                begin_year=begin_year, end_year=end_year, endpoint_subset=endpoints
+                begin_year=begin_year,
+                end_year=end_year,
+                endpoint_subset=endpoints,
+                max_concurrency=self.config.get("async", {}).get(
+                    "max_concurrent_requests", 10
+                ),
+                page_delay=urban_pagination.get("page_delay_ms", 300) / 1000.0,
+                flush_threshold=self.config.get("etl", {}).get("batch_size", 1000),
+                session=self.http,
             )
             logger.info(
-                f"Urban Institute ETL completed: {stats['rows_inserted']} rows inserted"
+                "Urban Institute ETL completed: %s rows inserted",
+                stats["rows_inserted"],
             )
             return True
         except Exception as e:
-            logger.error(f"Urban Institute ETL process failed: {e}")
+            logger.error("Urban Institute ETL process failed: %s", e)
             raise
 
     def run_location_etl(
@@ -121,14 +197,21 @@ class OrchestatedETLController:
         force_download: bool = False,
     ):
         try:
-            logger.info(f"Starting Location Data ETL process")
+            logger.info("Starting Location Data ETL process")
             qa_breakpoint("Starting Location Data ETL process", None)
 
             if not test_database_connection():
                 raise Exception("Database connection failed for location ETL")
 
+            location_cfg = self.config.get("location", {})
             success = geocode_coordinates_to_location_data(
-                table_name=table_name, data_dir=data_dir, force_download=force_download
+                table_name=table_name,
+                data_dir=data_dir,
+                force_download=force_download,
+                index_memory_mb=location_cfg.get("index_memory_mb",
+                                                 INDEX_BUILD_MEMORY_MB),
+                index_workers=location_cfg.get("index_parallel_workers",
+                                               INDEX_BUILD_WORKERS),
             )
             if not success:
                 raise Exception("Geocoding process failed")
@@ -136,7 +219,7 @@ class OrchestatedETLController:
             logger.info("Location Data ETL process completed successfully")
             return True
         except Exception as e:
-            logger.error(f"Location Data ETL process failed: {e}")
+            logger.error("Location Data ETL process failed: %s", e)
             raise
 
     async def run_complete_pipeline(
@@ -159,22 +242,49 @@ class OrchestatedETLController:
             logger.info("=" * 60)
 
             qa_breakpoint("Starting complete ETL pipeline", None)
-            if not skip_census:
-                logger.info("STAGE 1: Census Data Collection")
-                logger.info("-" * 40)
-                self.run_census_etl(census_begin_year, census_end_year)
+
+            async def census_stage():
+                # Census is blocking I/O; a worker thread lets it overlap Urban
+                thread = asyncio.ensure_future(
+                    asyncio.to_thread(
+                        self.run_census_etl, census_begin_year, census_end_year
+                    )
+                )
+                try:
+                    await asyncio.shield(thread)
+                except asyncio.CancelledError:
+                    # The thread cannot be cancelled; let it finish before the
+                    # shared engine is disposed. run_census_etl logs its errors.
+                    with suppress(Exception):
+                        await thread
+                    raise
                 logger.info("Stage 1 completed\n")
-            else:
-                logger.info("Skipping Census ETL")
-            if not skip_urban:
-                logger.info("STAGE 2: Urban Institute Data Collection")
-                logger.info("-" * 40)
+
+            async def urban_stage():
                 await self.run_urban_etl(
                     urban_begin_year, urban_end_year, urban_endpoints
                 )
                 logger.info("Stage 2 completed\n")
-            else:
-                logger.info("Skipping Urban ETL")
+
+            # Census and Urban share no tables, so stages 1 and 2 run together;
+            # the TaskGroup cancels the other stage if one fails
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    if not skip_census:
+                        logger.info("STAGE 1: Census Data Collection")
+                        logger.info("-" * 40)
+                        tg.create_task(census_stage())
+                    else:
+                        logger.info("Skipping Census ETL")
+                    if not skip_urban:
+                        logger.info("STAGE 2: Urban Institute Data Collection")
+                        logger.info("-" * 40)
+                        tg.create_task(urban_stage())
+                    else:
+                        logger.info("Skipping Urban ETL")
+            except* Exception as eg:
+                # Surface a single stage's own error rather than the group
+                raise eg.exceptions[0] if len(eg.exceptions) == 1 else eg
             if not skip_location:
                 logger.info(
                     "STAGE 3: Location Data Processing (Coordinates → Zipcodes)"
@@ -191,11 +301,11 @@ class OrchestatedETLController:
 
             logger.info("=" * 60)
             logger.info("COMPLETE ETL PIPELINE FINISHED SUCCESSFULLY!")
-            logger.info(f"Total pipeline duration: {duration}")
-            logger.info(f"Completed at: {pipeline_end.strftime('%Y-%m-%d %H:%M:%S')}")
+            logger.info("Total pipeline duration: %s", duration)
+            logger.info("Completed at: %s", pipeline_end.strftime("%Y-%m-%d %H:%M:%S"))
             logger.info("=" * 60)
         except Exception as e:
-            logger.error(f"Complete ETL pipeline failed: {e}")
+            logger.error("Complete ETL pipeline failed: %s", e)
             raise
 
     def get_etl_status(self):
@@ -208,7 +318,32 @@ class OrchestatedETLController:
         return status
 
 
-async def main():
+# Values argparse yields when no flags are given
+_CLI_DEFAULTS = {
+    "config": "config.json",
+    "census_begin_year": None,
+    "census_end_year": None,
+    "urban_begin_year": None,
+    "urban_end_year": None,
+    "urban_endpoints": None,
+    "location_table_name": "location_data",
+    "location_data_dir": None,
+    "location_force_download": False,
+    "census_only": False,
+    "urban_only": False,
+    "location_only": False,
+    "skip_census": False,
+    "skip_urban": False,
+    "skip_location": False,
+    "status": False,
+}
+
+
+def _parse_args():
+    # Scheduled runs pass no flags, so skip building the parser entirely
+    if len(sys.argv) == 1:
+        return argparse.Namespace(**_CLI_DEFAULTS)
+
     parser = argparse.ArgumentParser(
         description="Orchestrated ETL Controller for Complete Data Pipeline"
     )
@@ -259,52 +394,59 @@ async def main():
     parser.add_argument(
         "--status", action="store_true", help="Show ETL component status"
     )
+    parser.set_defaults(**_CLI_DEFAULTS)
+    return parser.parse_args()
+
 
-    args = parser.parse_args()
+async def main():
+    args = _parse_args()
 
     try:
-        etl_controller = OrchestatedETLController(args.config)
-        if args.status:
-            status = etl_controller.get_etl_status()
-            logger.info("ETL Component Status:")
-            logger.info(f"   Census ETL: {status['census_etl']}")
-            logger.info(f"   Urban ETL: {status['urban_etl']}")
-            logger.info(f"   Location ETL: {status['location_etl']}")
-            logger.info(f"   Census years: {status['config_years']['census']}")
-            logger.info(f"   Urban years: {status['config_years']['urban']}")
-            return
-        if args.census_only:
-            etl_controller.run_census_etl(args.census_begin_year, args.census_end_year)
-        elif args.urban_only:
-            await etl_controller.run_urban_etl(
-                args.urban_begin_year, args.urban_end_year, args.urban_endpoints
-            )
-        elif args.location_only:
-            etl_controller.run_location_etl(
-                args.location_table_name,
-                args.location_data_dir,
-                args.location_force_download,
-            )
-        else:
-            await etl_controller.run_complete_pipeline(
-                census_begin_year=args.census_begin_year,
-                census_end_year=args.census_end_year,
-                urban_begin_year=args.urban_begin_year,
-                urban_end_year=args.urban_end_year,
-                urban_endpoints=args.urban_endpoints,
-                location_table_name=args.location_table_name,
-                location_data_dir=args.location_data_dir,
-                location_force_download=args.location_force_download,
-                skip_census=args.skip_census,
-                skip_urban=args.skip_urban,
-                skip_location=args.skip_location,
-            )
+        async with OrchestatedETLController(args.config) as etl_controller:
+            if args.status:
+                status = etl_controller.get_etl_status()
+                logger.info("ETL Component Status:")
+                logger.info("   Census ETL: %s", status["census_etl"])
+                logger.info("   Urban ETL: %s", status["urban_etl"])
+                logger.info("   Location ETL: %s", status["location_etl"])
+                logger.info("   Census years: %s", status["config_years"]["census"])
+                logger.info("   Urban years: %s", status["config_years"]["urban"])
+                return
+            if args.census_only:
+                etl_controller.run_census_etl(
+                    args.census_begin_year, args.census_end_year
+                )
+            elif args.urban_only:
+                await etl_controller.run_urban_etl(
+                    args.urban_begin_year, args.urban_end_year, args.urban_endpoints
+                )
+            elif args.location_only:
+                etl_controller.run_location_etl(
+                    args.location_table_name,
+                    args.location_data_dir,
+                    args.location_force_download,
+                )
+            else:
+                await etl_controller.run_complete_pipeline(
+                    census_begin_year=args.census_begin_year,
+                    census_end_year=args.census_end_year,
+                    urban_begin_year=args.urban_begin_year,
+                    urban_end_year=args.urban_end_year,
+                    urban_endpoints=args.urban_endpoints,
+                    location_table_name=args.location_table_name,
+                    location_data_dir=args.location_data_dir,
+                    location_force_download=args.location_force_download,
+                    skip_census=args.skip_census,
+                    skip_urban=args.skip_urban,
+                    skip_location=args.skip_location,
+                )
 
         logger.info("Orchestrated ETL process completed successfully!")
     except Exception as e:
-        logger.error(f"Orchestrated ETL process failed: {e}")
+        logger.error("Orchestrated ETL process failed: %s", e)
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop's libuv loop dispatches sockets faster than the default selector
+    (uvloop.run if uvloop else asyncio.run)(main())
@@ -2,10 +2,13 @@
 
 import argparse
 import asyncio
+import csv
 import hashlib
+import io
 import json
 import logging
 import os
+import random
 import sys
 from contextlib import nullcontext
 from datetime import datetime
@@ -13,14 +16,25 @@ from pathlib import Path
 from typing import Dict, List
 
 import aiohttp
-import backoff
-from sqlalchemy import create_engine, text
+from aiolimiter import AsyncLimiter
+from sqlalchemy import column, create_engine, table, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from wakepy import keep  # type: ignore
 
 # Import ConfigLoader
 sys.path.append(str(Path(__file__).parent.parent / "config"))
 from config_loader import ConfigLoader
 
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop  # type: ignore
+except ImportError:
+    uvloop = None
+
 # Ensure logs directory exists
 os.makedirs("/app/logs", exist_ok=True)
 
@@ -56,10 +70,14 @@ def sanitize_identifier(name: str) -> str:
 
 
 class EndpointTableManager:
-    def __init__(self, engine, drop_existing: bool = False):
+    # Below this many rows a COPY round trip costs more than it saves
+    COPY_MIN_ROWS = 100
+
+    def __init__(self, engine, drop_existing: bool = False, bulk_writer="insert"):
         self.engine = engine
         self._created: set[str] = set()
         self._drop_existing = drop_existing
+        self._bulk_writer = bulk_writer
 
     def ensure_schema(self):
         with self.engine.connect() as conn:
@@ -98,40 +116,105 @@ class EndpointTableManager:
     ):
         if not records:
             return 0
-        table = table_name or f"urban_{sanitize_identifier(endpoint_key)}"
-        insert_sql = text(
-            f"""
-            INSERT INTO {DB_SCHEMA}.{table} (year, data_json, data_hash, fetched_at)
-            VALUES (:year, CAST(:data_json AS JSONB), :data_hash, :fetched_at)
-            ON CONFLICT (data_hash) DO NOTHING
-        """
+        table_name = table_name or f"urban_{sanitize_identifier(endpoint_key)}"
+        if self._bulk_writer == "copy" and len(records) >= self.COPY_MIN_ROWS:
+            return self._copy_insert(table_name, records)
+        # A Core insert() goes through insertmanyvalues, which packs the batch
+        # into multi-row VALUES pages; a text() statement would fall back to
+        # cursor.executemany and cost one round trip per row
+        target = table(
+            table_name,
+            column("year"),
+            column("data_json"),
+            column("data_hash"),
+            column("fetched_at"),
+            schema=DB_SCHEMA,
+        )
+        stmt = (
+            pg_insert(target)
+            .on_conflict_do_nothing(index_elements=["data_hash"])
+            .returning(target.c.data_hash)
         )
         with self.engine.connect() as conn:
-            result = conn.execute(insert_sql, records)
+            # rowcount only reflects the last page, so count RETURNING rows
+            inserted = len(conn.execute(stmt, records).all())
+            conn.commit()
+        return inserted
+
+    def _copy_insert(self, table: str, records: List[dict]) -> int:
+        """COPY rows into a temp staging table, then dedupe into the target."""
+        buf = io.StringIO()
+        csv.writer(buf).writerows(
+            (r["year"], r["data_json"], r["data_hash"], r["fetched_at"])
+            for r in records
+        )
+        buf.seek(0)
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    CREATE TEMP TABLE urban_stage (
+                        year INTEGER, data_json JSONB,
+                        data_hash VARCHAR(64), fetched_at TIMESTAMP
+                    ) ON COMMIT DROP
+                """
+                )
+                cur.copy_expert(
+                    "COPY urban_stage (year, data_json, data_hash, fetched_at) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buf,
+                )
+                cur.execute(
+                    f"""
+                    INSERT INTO {DB_SCHEMA}.{table} (year, data_json, data_hash, fetched_at)
+                    SELECT year, data_json, data_hash, fetched_at FROM urban_stage
+                    ON CONFLICT (data_hash) DO NOTHING
+                """
+                )
+                inserted = cur.rowcount
             conn.commit()
-        return result.rowcount if hasattr(result, "rowcount") else 0
+        finally:
+            conn.close()
+        return inserted
 
 
 class EndpointETL:
-    def __init__(self, config: Dict, drop_existing: bool = False):
+    # Attempts per page, counting the first request
+    FETCH_MAX_TRIES = 5
+
+    def __init__(
+        self,
+        config: Dict,
+        drop_existing: bool = False,
+        bulk_writer: str = "insert",
+        engine=None,
+    ):
         self.config = config
-        db = config.get("local_database", {})
-        conn_str = f"postgresql://{db['username']}:{db['password']}@{db['host']}:{db['port']}/{db['database']}"
-        self.engine = create_engine(
-            conn_str,
-            pool_size=10,
-            max_overflow=20,
-            pool_pre_ping=True,
-            pool_recycle=3600,
+        if engine is None:
+            db = config.get("local_database", {})
+            conn_str = f"postgresql://{db['username']}:{db['password']}@{db['host']}:{db['port']}/{db['database']}"
+            async_cfg = config.get("async", {})
+            engine = create_engine(
+                conn_str,
+                pool_size=async_cfg.get("connection_pool_size", 10),
+                max_overflow=async_cfg.get("max_overflow", 20),
+                pool_pre_ping=True,
+                pool_recycle=3600,
+            )
+        self.engine = engine
+        self.tables = EndpointTableManager(
+            self.engine, drop_existing=drop_existing, bulk_writer=bulk_writer
         )
-        with self.engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        self.tables = EndpointTableManager(self.engine, drop_existing=drop_existing)
         self.tables.ensure_schema()
         self.urban_cfg = self.config.get("urban", {})
         self.endpoint_templates: Dict[str, str] = self.urban_cfg.get("endpoints", {})
         self.raw_table_names: Dict[str, str] = {}
         self._assign_table_names()
+        # The fetch semaphore caps requests in flight; this caps their rate so
+        # bursts across endpoints stay under the API limit instead of drawing 429s
+        urban_rps = self.config.get("async", {}).get("urban_rps")
+        self.rate_limiter = AsyncLimiter(urban_rps, 1) if urban_rps else None
 
     def _assign_table_names(self):
         used: set[str] = set()
@@ -166,6 +249,21 @@ class EndpointETL:
 
         return sanitize_identifier(candidate[:60])
 
+    @staticmethod
+    def create_http_session() -> aiohttp.ClientSession:
+        """Pooled keep-alive session; callers may share one across ingests."""
+        connector = aiohttp.TCPConnector(
+            limit=100, limit_per_host=20, keepalive_timeout=75
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=None),
+            headers={
+                "Accept-Encoding": "gzip, deflate",
+                "User-Agent": "UrbanEndpointETL/1.0",
+            },
+        )
+
     @staticmethod
     def _giveup(e):
         return (
@@ -174,25 +272,31 @@ class EndpointETL:
             and e.status not in (429,)
         )
 
-    @backoff.on_exception(
-        backoff.expo,
-        (aiohttp.ClientError, asyncio.TimeoutError, aiohttp.ClientResponseError),
-        max_tries=5,
-        giveup=_giveup,
-        jitter=backoff.full_jitter,
-    )
     async def _fetch_page(self, session: aiohttp.ClientSession, url: str):
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                raise aiohttp.ClientResponseError(
-                    request_info=resp.request_info,
-                    history=resp.history,
-                    status=resp.status,
-                    message=f"Status {resp.status}",
-                )
-            return await resp.json()
-
-    async def _fetch_all(
+        for attempt in range(self.FETCH_MAX_TRIES):
+            try:
+                async with (
+                    self.rate_limiter or nullcontext(),
+                    session.get(url) as resp,
+                ):
+                    if resp.status != 200:
+                        raise aiohttp.ClientResponseError(
+                            request_info=resp.request_info,
+                            history=resp.history,
+                            status=resp.status,
+                            message=f"Status {resp.status}",
+                        )
+                    if orjson:
+                        # Parse the raw body directly, skipping the str decode step
+                        return orjson.loads(await resp.read())
+                    return await resp.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if self._giveup(e) or attempt == self.FETCH_MAX_TRIES - 1:
+                    raise
+                # Exponential backoff with full jitter: up to 1s, 2s, 4s, ...
+                await asyncio.sleep(random.uniform(0, 2**attempt))
+
+    async def _iter_pages(
         self,
         session,
         base_url: str,
@@ -200,9 +304,10 @@ class EndpointETL:
         year: int,
         page_delay: float,
         max_pages: int | None,
-    ) -> list:
+    ):
+        """Yield each page's results as it arrives instead of collecting them all."""
         ep = endpoint_template.format(year=year)
-        results, page = [], 0
+        page, seen = 0, 0
         next_url = f"{base_url}{ep}"
 
         while next_url and (max_pages is None or page < max_pages):
@@ -214,15 +319,17 @@ class EndpointETL:
                 break
 
             page_results = data.get("results", [])
-            results.extend(page_results)
+            seen += len(page_results)
 
             log_fn = logger.info if page == 1 else logger.debug
             log_msg = f"{ep} {year}: page {page} -> {len(page_results)} records"
             if page > 1:
-                log_msg += f" (cumulative {len(results)})"
+                log_msg += f" (cumulative {seen})"
             log_fn(log_msg)
 
             nxt = data.get("next")
+            if page_results:
+                yield page_results
             if nxt:
                 next_url = (
                     nxt
@@ -232,7 +339,6 @@ class EndpointETL:
                 await asyncio.sleep(page_delay)
             else:
                 next_url = None
-        return results
 
     async def ingest(
         self,
@@ -242,6 +348,7 @@ class EndpointETL:
         max_concurrency: int,
         page_delay: float,
         flush_threshold: int,
+        session: aiohttp.ClientSession | None = None,
     ) -> Dict:
         urban_cfg = self.urban_cfg
         base_url = urban_cfg.get("base_url", "")
@@ -261,103 +368,125 @@ class EndpointETL:
         max_pages = pagination_cfg.get("max_pages_per_endpoint")
 
         semaphore = asyncio.Semaphore(max_concurrency)
-        queue: asyncio.Queue = asyncio.Queue(maxsize=flush_threshold * 2)
+        # Items are whole pages, so bound the queue in pages per fetcher
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency * 2)
         total_inserted = 0
         total_seen = 0
 
-        try:
-            import orjson  # type: ignore
+        if orjson:
 
             def dumps(obj):
                 return orjson.dumps(obj).decode()
 
-        except Exception:
+        else:
 
             def dumps(obj):
                 return json.dumps(obj)
 
-        def format_records(records):
-            return [
-                {
-                    "year": r["year"],
-                    "data_json": r["data_json"],
-                    "data_hash": r["data_hash"],
-                    "fetched_at": r["fetched_at"],
-                }
-                for r in records
-            ]
-
         def flush_buffer(ep_key, records):
-            nonlocal total_inserted
-            self.tables.ensure_table(ep_key, self.raw_table_names[ep_key])
-            inserted = self.tables.bulk_insert(
-                ep_key, format_records(records), table_name=self.raw_table_names[ep_key]
+            return self.tables.bulk_insert(
+                ep_key, records, table_name=self.raw_table_names[ep_key]
             )
-            total_inserted += inserted
+
+        # Flushes overlap up to the pool size; beyond that the writer waits,
+        # the queue fills and fetchers are throttled
+        db_slots = asyncio.Semaphore(
+            self.config.get("async", {}).get("connection_pool_size", 10)
+        )
+
+        async def flush(ep_key, records):
+            nonlocal total_inserted
+            try:
+                # Blocking DB work runs off the loop so fetchers keep going
+                inserted = await asyncio.to_thread(flush_buffer, ep_key, records)
+                # Add after the await: `x += await ...` reads x before
+                # suspending and would drop counts from overlapping flushes
+                total_inserted += inserted
+            finally:
+                db_slots.release()
 
         async def writer():
             buffer_per_endpoint: Dict[str, list] = {}
-            while True:
-                item = await queue.get()
-                if item is None:
-                    break
-                ep_key = item["endpoint_key"]
-                buffer_per_endpoint.setdefault(ep_key, []).append(item)
-                if len(buffer_per_endpoint[ep_key]) >= flush_threshold:
-                    flush_buffer(ep_key, buffer_per_endpoint[ep_key])
-                    buffer_per_endpoint[ep_key].clear()
-
-            for ep_key, buf in buffer_per_endpoint.items():
-                if buf:
-                    flush_buffer(ep_key, buf)
+            async with asyncio.TaskGroup() as flushes:
+
+                async def submit(ep_key, records):
+                    # DDL stays serial so concurrent flushes never race on
+                    # creating (or dropping) the same table
+                    await asyncio.to_thread(
+                        self.tables.ensure_table, ep_key, self.raw_table_names[ep_key]
+                    )
+                    await db_slots.acquire()
+                    flushes.create_task(flush(ep_key, records))
+
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        break
+                    ep_key, rows = item
+                    buffer_per_endpoint.setdefault(ep_key, []).extend(rows)
+                    if len(buffer_per_endpoint[ep_key]) >= flush_threshold:
+                        await submit(ep_key, buffer_per_endpoint.pop(ep_key))
+
+                for ep_key, buf in buffer_per_endpoint.items():
+                    if buf:
+                        await submit(ep_key, buf)
             logger.info(f"Writer finished. Total inserted (unique): {total_inserted}")
 
         async def process(
             ep_key: str, template: str, year: int, session: aiohttp.ClientSession
         ):
             nonlocal total_seen
+            now = datetime.utcnow()
+            queued = 0
             async with semaphore:
-                records = await self._fetch_all(
+                # Rows are queued page by page, so only one page per fetcher
+                # is held in memory rather than the whole endpoint-year
+                async for records in self._iter_pages(
                     session, base_url, template, year, page_delay, max_pages
-                )
-            if not records:
+                ):
+                    rows = []
+                    for rec in records:
+                        json_text = dumps(rec)
+                        data_hash = hashlib.sha256(
+                            f"{ep_key}_{year}_{json_text}".encode("utf-8")
+                        ).hexdigest()
+                        rows.append(
+                            {
+                                "year": year,
+                                "data_json": json_text,
+                                "data_hash": data_hash,
+                                "fetched_at": now,
+                            }
+                        )
+                    # One queue hop per page; rows are already in the shape
+                    # bulk_insert binds, so the writer does not rebuild them
+                    await queue.put((ep_key, rows))
+                    queued += len(records)
+                    total_seen += len(records)
+            if not queued:
                 return
-            now = datetime.utcnow()
-            for rec in records:
-                json_text = dumps(rec)
-                data_hash = hashlib.sha256(
-                    f"{ep_key}_{year}_{json_text}".encode("utf-8")
-                ).hexdigest()
-                await queue.put(
-                    {
-                        "endpoint_key": ep_key,
-                        "year": year,
-                        "data_json": json_text,
-                        "data_hash": data_hash,
-                        "fetched_at": now,
-                    }
-                )
-            total_seen += len(records)
             logger.info(
-                f"Queued {len(records)} rows for {ep_key} {year} (cumulative seen {total_seen})"
+                f"Queued {queued} rows for {ep_key} {year} (cumulative seen {total_seen})"
             )
 
-        timeout = aiohttp.ClientTimeout(total=None)
-        headers = {
-            "Accept-Encoding": "gzip, deflate",
-            "User-Agent": "UrbanEndpointETL/1.0",
-        }
-        writer_task = asyncio.create_task(writer())
-        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-            tasks = []
-            for year in range(begin_year, end_year + 1):
-                for ep_key, template in endpoints_map.items():
-                    tasks.append(
-                        asyncio.create_task(process(ep_key, template, year, session))
-                    )
-            await asyncio.gather(*tasks)
-        await queue.put(None)
-        await writer_task
+        async def produce(session):
+            # A failing fetch cancels its siblings instead of letting them
+            # run to completion
+            async with asyncio.TaskGroup() as fetchers:
+                for year in range(begin_year, end_year + 1):
+                    for ep_key, template in endpoints_map.items():
+                        fetchers.create_task(process(ep_key, template, year, session))
+            await queue.put(None)
+
+        # An injected session stays open for the caller; otherwise own one
+        async with (
+            nullcontext(session) if session else self.create_http_session()
+        ) as session:
+            # Writer and fetchers share a group: if a flush fails, producers
+            # blocked on the full queue are cancelled rather than left waiting
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(writer())
+                tg.create_task(produce(session))
         stats = {
             "rows_seen": total_seen,
             "rows_inserted": total_inserted,
@@ -564,4 +693,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    (uvloop.run if uvloop else asyncio.run)(main())
@@ -35,6 +35,11 @@ try:
 except ImportError:
     sys.exit("psycopg2 not found — run: pip install psycopg2-binary")
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -178,9 +183,16 @@ EXTRA_METRICS = [
 
 
 def write_ndjson(path: Path, records: list):
-    with open(path, "w", encoding="utf-8") as fh:
-        for rec in records:
-            fh.write(json.dumps({k: v for k, v in rec.items() if v is not None}) + "\n")
+    if orjson is not None:
+        # orjson hands back UTF-8 bytes with the newline already appended
+        with open(path, "wb") as fh:
+            for rec in records:
+                fh.write(orjson.dumps({k: v for k, v in rec.items() if v is not None},
+                                      option=orjson.OPT_APPEND_NEWLINE))
+    else:
+        with open(path, "w", encoding="utf-8") as fh:
+            for rec in records:
+                fh.write(json.dumps({k: v for k, v in rec.items() if v is not None}) + "\n")
     print(f"  wrote {len(records):>6,} records → {path}")
 
 
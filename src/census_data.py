@@ -169,12 +169,15 @@ class SimpleCensusETL:
                 logger.warning(f"No data for {year}")
                 return pd.DataFrame()
 
-            census_data.reset_index(inplace=True)
-            census_data["zip_code"] = census_data["index"].apply(
-                lambda x: x.params()[0][1]
-                if hasattr(x, "params") and x.params()
-                else str(x)
-            )
+            # One pass over the censusgeo index instead of a per-row apply
+            zip_codes = [
+                geo.params()[0][1]
+                if hasattr(geo, "params") and geo.params()
+                else str(geo)
+                for geo in census_data.index
+            ]
+            census_data.reset_index(drop=True, inplace=True)
+            census_data["zip_code"] = zip_codes
 
             for old_name, new_name in census_variables.items():
                 if old_name in census_data.columns:
@@ -182,7 +185,6 @@ class SimpleCensusETL:
 
             census_data["year"] = year
             census_data["data_source"] = "census_api"
-            census_data.drop(columns=["index"], inplace=True, errors="ignore")
             for col in census_data.columns:
                 if col not in ["zip_code", "year", "data_source"]:
                     census_data[col] = census_data[col].fillna(0)
@@ -14,6 +14,11 @@ from location_data import (geocode_coordinates_to_location_data,
 from urban_data import EndpointETL
 from urban_data import load_config as load_urban_config
 
+try:
+    from orjson import loads as _json_loads  # type: ignore
+except ImportError:
+    _json_loads = json.loads
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
@@ -52,8 +57,8 @@ class OrchestatedETLController:
 
     def _load_config(self, config_file):
         try:
-            with open(config_file, "r") as f:
-                config = json.load(f)
+            with open(config_file, "rb") as f:
+                config = _json_loads(f.read())
             logger.info("Configuration loaded successfully")
             return config
         except FileNotFoundError: